@@ -1,19 +1,75 @@
 import streamlit as st
 import os
+import sys
+import errno
 import shutil
-import pandas as pd
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- CONFIGURATION ---
 DEFAULT_START_DIR = "/volume1/Zack/media/MAM - Audiobooks - Seeding"
 LIBRARY_DESTINATION = "/volume1/Zack/media/audiobooks"
+COPY_WORKERS = 2  # Books copied in parallel (one disk, sequential I/O: more workers just seek)
 
 st.set_page_config(page_title="Audiobook Importer", layout="wide")
 
+# --- HELPERS ---
+def fast_copy(src, dst):
+    """Copy a file in-kernel (reflink on btrfs/XFS), then copy its timestamps/permissions."""
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            blocksize = max(size, 8 * 1024 * 1024)
+            if sys.maxsize < 2 ** 32:
+                # copy_file_range takes a C ssize_t: on 32-bit builds (arm/v7) >=2 GiB would overflow
+                blocksize = min(blocksize, 2 ** 30)
+            copied = 0
+            while True:
+                sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), blocksize)
+                if sent == 0:
+                    break
+                copied += sent
+            if copied == 0:
+                # procfs/FUSE/some network mounts return 0 at offset 0 instead of failing
+                raise OSError(errno.ENOTSUP, "copy_file_range copied nothing", src)
+    except (AttributeError, OSError):
+        # No copy_file_range here (non-Linux, cross-device, ENOSYS...): let shutil pick sendfile/read-write
+        shutil.copyfile(src, dst)
+    else:
+        if copied < size:
+            raise OSError(errno.EIO, f"Short copy ({copied} of {size} bytes)", src)
+    shutil.copystat(src, dst)
+    return dst
+
+def copy_item(src_path, dest_path):
+    """Copy one selected folder/file into dest_path. Runs in a worker thread, so no st.* calls here."""
+    # Copy into a temp folder and rename at the end, so a crash never leaves a half-copied
+    # book at dest_path (which the next run would then SKIP as "Exists"). The temp name is
+    # hidden so library scanners ignore it, and it sits beside dest_path so the rename is atomic.
+    # mkdtemp gives every job its own folder, so two sessions importing the same book can't
+    # delete each other's work; only the folder this job created is ever removed.
+    dest_parent, dest_name = os.path.split(dest_path)
+    tmp_path = tempfile.mkdtemp(dir=dest_parent, prefix=f".{dest_name}.", suffix=".partial")
+    try:
+        if os.path.isdir(src_path):
+            shutil.copytree(src_path, tmp_path, copy_function=fast_copy, dirs_exist_ok=True)
+        else:
+            shutil.copymode(dest_parent, tmp_path)  # mkdtemp is 0700; match the library folder instead
+            fast_copy(src_path, os.path.join(tmp_path, os.path.basename(src_path)))
+        os.rename(tmp_path, dest_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def list_source_items(path, mtime_ns):
+    """Visible entries of the source folder. mtime_ns is only part of the cache key: it changes when entries are added/removed/renamed."""
+    with os.scandir(path) as it:
+        return sorted(entry.name for entry in it if not entry.name.startswith('.'))
+
 # --- SESSION STATE INITIALIZATION ---
 if 'selected_files' not in st.session_state:
     st.session_state['selected_files'] = []
-if 'all_files' not in st.session_state:
-    st.session_state['all_files'] = []
 
 st.title("🎧 Audiobook Importer (Docker/Web)")
 
@@ -23,14 +79,14 @@ source_path = st.sidebar.text_input("Source Path", value=DEFAULT_START_DIR)
 
 if st.sidebar.button("Refresh File List"):
     # Force reload of file list
+    list_source_items.clear()
     st.session_state['selected_files'] = [] 
 
 # --- MAIN: FILE EXPLORER ---
 if os.path.exists(source_path):
     try:
-        # Get all visible folders/files
-        files = sorted([f for f in os.listdir(source_path) if not f.startswith('.')])
-        st.session_state['all_files'] = files
+        # Get all visible folders/files (only re-listed when the folder itself changes)
+        files = list_source_items(source_path, os.stat(source_path).st_mtime_ns)
         
         col1, col2 = st.columns([1, 4])
         with col1:
@@ -82,9 +138,8 @@ if st.session_state['selected_files']:
             "Title": title
         })
     
-    # Create editable dataframe
-    df = pd.DataFrame(data_list)
-    edited_df = st.data_editor(df, use_container_width=True, num_rows="fixed")
+    # Create editable table (a list of records comes back as a list of records, no DataFrame needed)
+    edited_rows = st.data_editor(data_list, use_container_width=True, num_rows="fixed")
 
     st.divider()
 
@@ -105,42 +160,51 @@ if st.session_state['selected_files']:
         if not os.path.exists(LIBRARY_DESTINATION):
             os.makedirs(LIBRARY_DESTINATION, exist_ok=True)
 
-        total_files = len(edited_df)
+        total_files = len(edited_rows)
+        jobs = {}
+        queued = set()
         
-        for index, row in edited_df.iterrows():
-            # Update Progress
-            progress_bar.progress((index + 1) / total_files)
-            status_text.text(f"Copying: {row['Title']}...")
-
-            # 1. READ FROM EDITED DATAFRAME
-            author = str(row['Author']).strip()
-            series = str(row['Series']).strip()
-            title = str(row['Title']).strip()
-            src_name = row['Original Folder']
-            
-            src_path = os.path.join(source_path, src_name)
-
-            # 2. CONSTRUCT DESTINATION
-            if series:
-                new_folder_name = f"{author} - {series} - {title}"
-            else:
-                new_folder_name = f"{author} - {title}"
-            
-            dest_path = os.path.join(LIBRARY_DESTINATION, new_folder_name)
+        with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+            for row in edited_rows:
+                # 1. READ FROM EDITED ROWS
+                author = str(row['Author']).strip()
+                series = str(row['Series']).strip()
+                title = str(row['Title']).strip()
+                src_name = row['Original Folder']
+                
+                src_path = os.path.join(source_path, src_name)
+
+                # 2. CONSTRUCT DESTINATION
+                if series:
+                    new_folder_name = f"{author} - {series} - {title}"
+                else:
+                    new_folder_name = f"{author} - {title}"
+                
+                dest_path = os.path.join(LIBRARY_DESTINATION, new_folder_name)
 
-            # 3. PERFORM COPY
-            try:
-                if os.path.exists(dest_path):
+                # 3. QUEUE COPY (two rows edited to the same name must not race each other)
+                if os.path.exists(dest_path) or dest_path in queued:
                     errors.append(f"SKIPPED (Exists): {new_folder_name}")
                 else:
-                    if os.path.isdir(src_path):
-                        shutil.copytree(src_path, dest_path)
-                    else:
-                        os.makedirs(dest_path, exist_ok=True)
-                        shutil.copy2(src_path, dest_path)
-                    success_count += 1
-            except Exception as e:
-                errors.append(f"Error {new_folder_name}: {e}")
+                    queued.add(dest_path)
+                    jobs[executor.submit(copy_item, src_path, dest_path)] = new_folder_name
+
+            # 4. COLLECT RESULTS (progress is only touched from this thread)
+            try:
+                status_text.text(f"Copying {len(jobs)} items...")
+                for done, future in enumerate(as_completed(jobs), start=1):
+                    new_folder_name = jobs[future]
+                    progress_bar.progress(done / len(jobs))
+                    status_text.text(f"Copied: {new_folder_name}")
+                    try:
+                        future.result()
+                        success_count += 1
+                    except Exception as e:
+                        errors.append(f"Error {new_folder_name}: {e}")
+            except BaseException:
+                # Streamlit stop/rerun lands here: drop queued copies, only in-flight ones finish
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
 
         # Final Report
         progress_bar.empty()